@@ -33,6 +33,13 @@ class SourceReport:
     sent: int = 0              # успешно отправлено в канал
     skipped: int = 0           # пропущено (дубликаты, фильтр и т.п.)
     errors: List[str] = field(default_factory=list)
+    breaker: str = "closed"    # состояние circuit breaker'а после рана (closed/open/half_open)
+    timeout: float = 0         # таймаут HTTP-запросов, выбранный для этого рана
+    http_requests: int = 0     # успешных HTTP-запросов
+    http_seconds: float = 0.0  # суммарное время успешных HTTP-запросов
+    http_timeouts: int = 0     # запросов, упавших по таймауту
+    fetch_failed: bool = False # контент не получен, хотя листинг отдался (статьи подряд не качаются)
+    failed_articles: List[str] = field(default_factory=list)  # статьи HTML-источника, не скачанные в этом ране
 
 @dataclass
 class RunReport:
@@ -42,6 +49,7 @@ class RunReport:
     total_new_found: int = 0
     total_sent: int = 0
     total_errors: int = 0
+    skipped_sources: int = 0   # пропущено открытым circuit breaker'ом
     sources: List[SourceReport] = field(default_factory=list)
     extra: Dict[str, Any] = field(default_factory=dict)
 
@@ -53,6 +61,7 @@ class RunReport:
             "total_new_found": self.total_new_found,
             "total_sent": self.total_sent,
             "total_errors": self.total_errors,
+            "skipped_sources": self.skipped_sources,
             "sources": [vars(s) for s in self.sources],
             "extra": self.extra,
         }
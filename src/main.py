@@ -1,7 +1,8 @@
 import os, datetime, traceback
 from typing import List
-from logging_utils import setup_logger, RunReport, save_run_report
-from rss_reader import load_sources, parse_feed, mark_new, update_sent_log
+from logging_utils import setup_logger, RunReport, SourceReport, save_run_report
+from rss_reader import load_sources, parse_feed, mark_new, update_sent_log, load_sent_log
+from source_health import HealthRegistry
 from telegram_sender import safe_post, PostResult
 # из ваших файлов — не трогаем внутренности:
 from rewrite import rewrite_news
@@ -20,9 +21,13 @@ def should_post(title: str, summary_html: str) -> bool:
     # Пока пропускаем фильтрацию; публикуем все новые записи.
     return True
 
-def process_source(url: str, report_obj) -> None:
-    entries, src = parse_feed(url)
+def process_source(url: str, report_obj, health: HealthRegistry) -> None:
+    # уже отправленные и «сломанные» статьи HTML-источников повторно не качаем
+    skip_links = set(load_sent_log()) | health.skip_articles(url)
+    entries, src = parse_feed(url, timeout=health.timeout_for(url), skip_links=skip_links)
     report_obj.sources.append(src)
+    # здоровье источника считаем только по фетчу — до ошибок TG/rewrite
+    health.record(src)
 
     # определяем новые записи
     new_entries, n_new = mark_new(entries)
@@ -65,26 +70,41 @@ def main():
         logger.warning("Список источников пуст.")
         return
 
-    for url in sources:
-        process_source(url, run)
+    health = HealthRegistry().load()
+    health.prune(sources)
+    for url in health.order(sources):
+        if not health.allow(url):
+            logger.info("Breaker открыт, пропускаем источник: %s", url)
+            run.sources.append(SourceReport(source=url, breaker="open"))
+            run.skipped_sources += 1
+            continue
+        try:
+            process_source(url, run, health)
+        finally:
+            health.save()
 
     # агрегированные итоги
     run.total_new_found = sum(s.new_found for s in run.sources)
     run.total_sent = sum(s.sent for s in run.sources)
     run.total_errors = sum(len(s.errors) for s in run.sources)
     run.finished_at = datetime.datetime.now().isoformat(timespec="seconds")
+    run.extra["source_health"] = health.snapshot(sources)
 
     # логируем сводку и сохраняем JSON-отчёт
     logger.info("=== СВОДКА РАНА ===")
+    if run.skipped_sources:
+        logger.warning("Пропущено источников (breaker открыт): %d", run.skipped_sources)
     for s in run.sources:
-        if s.errors:
-            logger.warning("Источник: %s | новые=%d | отправлено=%d | ошибок=%d",
-                        s.source, s.new_found, s.sent, len(s.errors))
+        if s.breaker == "open" and not s.fetched and not s.errors:
+            logger.info("Источник: %s | breaker=open | пропущен", s.source)
+        elif s.errors:
+            logger.warning("Источник: %s | breaker=%s | новые=%d | отправлено=%d | ошибок=%d",
+                        s.source, s.breaker, s.new_found, s.sent, len(s.errors))
             for err in s.errors:
                 logger.warning("  • %s", err)
         else:
-            logger.info("Источник: %s | новые=%d | отправлено=%d | ошибок=0",
-                        s.source, s.new_found, s.sent)
+            logger.info("Источник: %s | breaker=%s | новые=%d | отправлено=%d | ошибок=0",
+                        s.source, s.breaker, s.new_found, s.sent)
 
     path = save_run_report(run)
     logger.info("Отчёт сохранён: %s", path)
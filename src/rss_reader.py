@@ -2,7 +2,7 @@
 import os
 import time
 import traceback
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from urllib.parse import urljoin
 
@@ -38,24 +38,34 @@ class ParsedEntry:
     summary_html: str
 
 
-def parse_feed(url: str, timeout: int = 20) -> Tuple[List["ParsedEntry"], SourceReport]:
+def parse_feed(url: str, timeout: float = 20,
+               skip_links: Optional[Set[str]] = None) -> Tuple[List["ParsedEntry"], SourceReport]:
     """
     Универсальный парсер:
     - если источник начинается с 'HTML:', то парсим HTML-листинг (WordPress)
-      и добираем полный текст каждой статьи;
+      и добираем полный текст каждой статьи, кроме ссылок из skip_links
+      (уже отправленные и «сломанные» статьи повторно не качаем);
     - иначе пробуем обычный RSS/Atom через feedparser.
+    Ленту качаем сами через _http_get, чтобы на неё тоже действовал timeout
+    (feedparser.parse(url) своего таймаута не имеет).
     """
-    report = SourceReport(source=url)
+    report = SourceReport(source=url, timeout=timeout)
 
     try:
         if url.startswith("HTML:"):
             base_url = url.split("HTML:", 1)[1].strip()
-            entries = _parse_html_source(base_url, timeout=timeout, report=report)
-            report.fetched = len(entries)
+            entries = _parse_html_source(base_url, timeout=timeout, report=report,
+                                         skip_links=skip_links or set())
             return entries, report
 
         # --- Обычный RSS/Atom ---
-        feed = feedparser.parse(url)
+        r = _http_get(url, timeout=timeout, report=report, headers=_FEED_HEADERS)
+        # Передаём HTTP-контекст, который feedparser.parse(url) брал бы сам:
+        # charset из Content-Type и базовый URL для относительных ссылок.
+        # content-encoding не передаём — requests уже распаковал тело.
+        headers = {k.lower(): v for k, v in r.headers.items() if k.lower() != "content-encoding"}
+        headers["content-location"] = r.url
+        feed = feedparser.parse(r.content, response_headers=headers)
         if feed.bozo:
             report.errors.append(f"bozo={feed.bozo}; exc={getattr(feed, 'bozo_exception', None)}")
             logger.error("Проблема парсинга '%s': %s", url, getattr(feed, 'bozo_exception', None))
@@ -85,10 +95,10 @@ def parse_feed(url: str, timeout: int = 20) -> Tuple[List["ParsedEntry"], Source
         return [], report
 
 
-def mark_new(entries: List[ParsedEntry], sent_log_path: str = "sent_log.json") -> Tuple[List[ParsedEntry], int]:
+def load_sent_log(sent_log_path: str = "sent_log.json") -> Dict[str, int]:
     """
-    Фильтрует только новые записи, используя sent_log.json (формат: {entry_id: timestamp})
-    ВНИМАНИЕ: используем словарь {id: ts}. Если у вас старый формат-список — он будет прочитан как пустой.
+    Читает sent_log.json (формат: {entry_id: timestamp}).
+    Старый формат-список преобразуется во временный словарь.
     """
     import json
     sent = {}
@@ -101,6 +111,14 @@ def mark_new(entries: List[ParsedEntry], sent_log_path: str = "sent_log.json") -
                     sent = {k: int(time.time()) for k in sent}
         except Exception:
             pass
+    return sent
+
+
+def mark_new(entries: List[ParsedEntry], sent_log_path: str = "sent_log.json") -> Tuple[List[ParsedEntry], int]:
+    """
+    Фильтрует только новые записи, используя sent_log.json (формат: {entry_id: timestamp})
+    """
+    sent = load_sent_log(sent_log_path)
 
     new_entries = []
     for e in entries:
@@ -112,15 +130,7 @@ def mark_new(entries: List[ParsedEntry], sent_log_path: str = "sent_log.json") -
 
 def update_sent_log(entries: List[ParsedEntry], sent_log_path: str = "sent_log.json") -> None:
     import json
-    sent = {}
-    if os.path.exists(sent_log_path):
-        try:
-            with open(sent_log_path, "r", encoding="utf-8") as f:
-                sent = json.load(f)
-                if isinstance(sent, list):  # совместимость со старым форматом
-                    sent = {k: int(time.time()) for k in sent}
-        except Exception:
-            pass
+    sent = load_sent_log(sent_log_path)
 
     now = int(time.time())
     for e in entries:
@@ -138,20 +148,45 @@ _UA = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
 }
 
-def _http_get(url: str, timeout: int = 20) -> requests.Response:
-    resp = requests.get(url, headers=_UA, timeout=timeout, allow_redirects=True)
+# Для RSS/Atom — Accept как у feedparser, чтобы сервер отдавал ленту, а не HTML
+_FEED_HEADERS = {
+    **_UA,
+    "Accept": "application/atom+xml,application/rdf+xml,application/rss+xml,"
+              "application/x-netcdf,application/xml;q=0.9,text/xml;q=0.2,*/*;q=0.1",
+}
+
+# Сколько статей подряд может упасть по таймауту/соединению, прежде чем
+# перестанем их дёргать в этом ране (ошибки страниц — 404/403 — сюда не входят)
+ARTICLE_FAIL_LIMIT = 3
+
+def _http_get(url: str, timeout: float = 20, report: Optional[SourceReport] = None,
+              headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    started = time.monotonic()
+    try:
+        resp = requests.get(url, headers=headers or _UA, timeout=timeout, allow_redirects=True)
+    except requests.Timeout:
+        # таймаут — тоже замер задержки (не меньше timeout), иначе оценка хоста
+        # никогда не вырастет и медленный хост навсегда останется с коротким таймаутом
+        if report is not None:
+            report.http_timeouts += 1
+        raise
     resp.raise_for_status()
+    if report is not None:
+        report.http_requests += 1
+        report.http_seconds += time.monotonic() - started
     return resp
 
 
-def _parse_html_source(listing_url: str, timeout: int, report: SourceReport) -> List[ParsedEntry]:
+def _parse_html_source(listing_url: str, timeout: float, report: SourceReport,
+                       skip_links: Set[str]) -> List[ParsedEntry]:
     """
     Разбираем страницу листинга новостей WordPress:
     - вытягиваем ссылки и заголовки (обычно h2.entry-title > a)
-    - по каждой ссылке заходим и забираем полный текст (.entry-content)
+    - по каждой ссылке, кроме skip_links, заходим и забираем полный текст (.entry-content)
+    report.fetched — все ссылки листинга, включая пропущенные и не скачанные.
     """
     try:
-        r = _http_get(listing_url, timeout=timeout)
+        r = _http_get(listing_url, timeout=timeout, report=report)
     except Exception as ex:
         msg = f"LISTING GET fail: {ex}"
         logger.error(msg)
@@ -167,6 +202,7 @@ def _parse_html_source(listing_url: str, timeout: int, report: SourceReport) ->
         link_nodes = soup.select("article a")
 
     collected: List[ParsedEntry] = []
+    host_fails = 0
 
     for a in link_nodes:
         href = (a.get("href") or "").strip()
@@ -174,9 +210,35 @@ def _parse_html_source(listing_url: str, timeout: int, report: SourceReport) ->
         if not href or not title:
             continue
         full_url = urljoin(listing_url, href)
+        report.fetched += 1
+        if full_url in skip_links:
+            continue
 
-        # Забираем полный текст статьи
-        text_html, published = _fetch_full_article(full_url, timeout=timeout, report=report)
+        # Забираем полный текст статьи. Не скачанные статьи не отдаём дальше:
+        # иначе они уйдут в канал без тела и попадут в sent_log, а так их
+        # подберёт следующий ран (пока статья не наберёт лимит неудачных ранов).
+        try:
+            text_html, published = _fetch_full_article(full_url, timeout=timeout, report=report)
+        except (requests.Timeout, requests.ConnectionError) as ex:
+            msg = f"ARTICLE GET fail: {ex} | {full_url}"
+            logger.warning(msg)
+            report.errors.append(msg)
+            report.failed_articles.append(full_url)
+            host_fails += 1
+            if host_fails >= ARTICLE_FAIL_LIMIT:
+                # хост подряд не отдаёт статьи — не ждём таймаут на каждой
+                msg = f"ARTICLE GET: {ARTICLE_FAIL_LIMIT} таймаута/обрыва подряд, остальные статьи не качаем"
+                logger.warning("%s | %s", msg, listing_url)
+                report.errors.append(msg)
+                report.fetch_failed = True
+                # это сбой хоста, а не статей — не копим им счётчик неудачных ранов
+                del report.failed_articles[-ARTICLE_FAIL_LIMIT:]
+                break
+            continue
+        host_fails = 0
+        if text_html is None:
+            report.failed_articles.append(full_url)
+            continue
         entry = ParsedEntry(
             id=full_url,
             title=title,
@@ -189,19 +251,22 @@ def _parse_html_source(listing_url: str, timeout: int, report: SourceReport) ->
     return collected
 
 
-def _fetch_full_article(url: str, timeout: int, report: SourceReport) -> Tuple[str, str]:
+def _fetch_full_article(url: str, timeout: float, report: SourceReport) -> Tuple[Optional[str], str]:
     """
     Переходим в статью и достаём HTML-тело.
     Ищем типичные WP-селекторы .entry-content, .post-content и т.п.
-    Возвращаем (html, published_str)
+    Возвращаем (html, published_str); html=None, если страница не отдалась (404/403 и т.п.).
+    Таймауты и обрывы соединения пробрасываем — это проблема хоста, а не статьи.
     """
     try:
-        r = _http_get(url, timeout=timeout)
+        r = _http_get(url, timeout=timeout, report=report)
+    except (requests.Timeout, requests.ConnectionError):
+        raise
     except Exception as ex:
         msg = f"ARTICLE GET fail: {ex} | {url}"
         logger.warning(msg)
         report.errors.append(msg)
-        return "", ""
+        return None, ""
 
     soup = BeautifulSoup(r.text, "html.parser")
 
@@ -0,0 +1,232 @@
+# source_health.py
+import os
+import json
+import time
+from typing import Dict, Any, List, Optional, Set
+from dataclasses import dataclass, field, asdict
+from urllib.parse import urlparse
+
+from logging_utils import setup_logger, SourceReport
+
+logger = setup_logger("source_health")
+
+# --- Настройки circuit breaker ------------------------------------------------
+
+FAILURE_THRESHOLD = 3          # подряд неудачных ранов до размыкания
+BASE_COOLDOWN = 110 * 60       # первая пауза перед пробой (сек): ран по cron через час пропускаем, через два — пробуем
+MAX_COOLDOWN = 24 * 60 * 60    # потолок паузы при повторных срывах пробы
+LATENCY_ALPHA = 0.3            # вес нового замера в EWMA задержки
+SCORE_ALPHA = 0.3              # вес нового рана в EWMA успешности
+MIN_TIMEOUT = 5
+MAX_TIMEOUT = 20
+TIMEOUT_FACTOR = 3.0           # таймаут = задержка хоста * фактор (в пределах MIN..MAX)
+ARTICLE_MAX_FAILED_RUNS = 3    # после стольких ранов с неудачей статью HTML-источника больше не качаем
+ARTICLE_MEMORY = 200           # сколько «сломанных» статей помним на источник
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class SourceHealth:
+    source: str
+    state: str = CLOSED
+    score: float = 1.0              # EWMA успешности ранов, 1.0 — всё хорошо
+    consecutive_failures: int = 0
+    total_failures: int = 0
+    trips: int = 0                  # сколько раз подряд размыкался (растит паузу)
+    opened_at: int = 0
+    last_error: str = ""
+    article_failures: Dict[str, int] = field(default_factory=dict)  # url статьи -> ранов с неудачей
+
+
+def host_of(source: str) -> str:
+    url = source.split("HTML:", 1)[1].strip() if source.startswith("HTML:") else source
+    return urlparse(url).netloc.lower()
+
+
+class HealthRegistry:
+    """
+    Постоянное (между ранами) состояние источников, хранится в source_health.json:
+    - по источнику: состояние breaker'а, счётчики ошибок и «оценка здоровья»;
+    - по хосту: EWMA задержки HTTP-запроса, из неё считается адаптивный таймаут.
+    """
+
+    def __init__(self, path: str = "source_health.json"):
+        self.path = path
+        self.sources: Dict[str, SourceHealth] = {}
+        self.latency: Dict[str, float] = {}
+        self._saved: Optional[Any] = None
+
+    # --- хранение ---
+
+    def load(self) -> "HealthRegistry":
+        if not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for src, raw in (data.get("sources") or {}).items():
+                known = {k: v for k, v in raw.items() if k in SourceHealth.__dataclass_fields__}
+                known["source"] = src
+                self.sources[src] = SourceHealth(**known)
+            self.latency = {h: float(v) for h, v in (data.get("latency") or {}).items()}
+            self._saved = self._significant()
+        except Exception as ex:
+            logger.warning("Не удалось прочитать %s (%s) — начинаем с чистого состояния.", self.path, ex)
+            self.sources, self.latency = {}, {}
+        return self
+
+    def _significant(self) -> Any:
+        """
+        То, что влияет на решения следующего рана. Дрожание EWMA, не меняющее
+        таймаут или оценку, файл не перезаписывает — иначе workflow коммитил бы его каждый час.
+        """
+        return (
+            sorted(
+                (src, h.state, h.consecutive_failures, h.trips, h.opened_at,
+                 round(h.score, 1), sorted(h.article_failures.items()))
+                for src, h in self.sources.items()
+            ),
+            sorted(
+                (host, round(min(max(lat * TIMEOUT_FACTOR, MIN_TIMEOUT), MAX_TIMEOUT)))
+                for host, lat in self.latency.items()
+            ),
+        )
+
+    def save(self) -> None:
+        significant = self._significant()
+        if significant == self._saved:
+            return
+        sources = {}
+        for src, h in self.sources.items():
+            raw = asdict(h)
+            raw["score"] = round(h.score, 3)
+            sources[src] = raw
+        data = {
+            "sources": sources,
+            "latency": {host: round(lat, 2) for host, lat in self.latency.items()},
+        }
+        # пишем во временный файл и подменяем: обрыв записи не сотрёт состояние
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+        self._saved = significant
+
+    def prune(self, sources: List[str]) -> None:
+        """Забываем источники, которых больше нет в rss_sources.txt, и их хосты."""
+        self.sources = {src: h for src, h in self.sources.items() if src in sources}
+        hosts = {host_of(src) for src in sources}
+        self.latency = {host: lat for host, lat in self.latency.items() if host in hosts}
+
+    # --- решения перед фетчем ---
+
+    def get(self, source: str) -> SourceHealth:
+        if source not in self.sources:
+            self.sources[source] = SourceHealth(source=source)
+        return self.sources[source]
+
+    def cooldown(self, h: SourceHealth) -> float:
+        return min(BASE_COOLDOWN * (2 ** max(h.trips - 1, 0)), MAX_COOLDOWN)
+
+    def allow(self, source: str, now: Optional[float] = None) -> bool:
+        """
+        closed — пускаем; open — пропускаем, пока не истекла пауза,
+        затем переводим в half_open и пускаем одну пробу.
+        """
+        now = time.time() if now is None else now
+        h = self.get(source)
+        if h.state == OPEN:
+            if now - h.opened_at < self.cooldown(h):
+                return False
+            h.state = HALF_OPEN
+            logger.info("Breaker half-open, пробуем источник: %s", source)
+        return True
+
+    def order(self, sources: List[str]) -> List[str]:
+        """Здоровые источники вперёд, открытые (кандидаты на пробу) и «больные» — в конец."""
+        return sorted(sources, key=lambda s: (self.get(s).state != CLOSED, -self.get(s).score))
+
+    def timeout_for(self, source: str) -> float:
+        # пробу даём с полным таймаутом: оценка задержки к этому моменту могла устареть
+        if self.get(source).state == HALF_OPEN:
+            return MAX_TIMEOUT
+        lat = self.latency.get(host_of(source))
+        if lat is None:
+            return MAX_TIMEOUT
+        return round(min(max(lat * TIMEOUT_FACTOR, MIN_TIMEOUT), MAX_TIMEOUT), 1)
+
+    def skip_articles(self, source: str) -> Set[str]:
+        """Статьи, которые не скачались в ARTICLE_MAX_FAILED_RUNS ранах — их больше не качаем."""
+        return {url for url, n in self.get(source).article_failures.items()
+                if n >= ARTICLE_MAX_FAILED_RUNS}
+
+    # --- учёт результата ---
+
+    def observe_latency(self, source: str, seconds: float) -> None:
+        host = host_of(source)
+        if not host:
+            return
+        prev = self.latency.get(host)
+        self.latency[host] = seconds if prev is None else prev + LATENCY_ALPHA * (seconds - prev)
+
+    def record(self, report: SourceReport, now: Optional[float] = None) -> SourceHealth:
+        """
+        Ран считается неудачным, если источник не отдал ни одной записи и есть ошибки,
+        либо статьи HTML-источника подряд падают по таймауту/соединению (fetch_failed).
+        Единичные ошибки (часть статей не скачалась) только снижают оценку,
+        а сами статьи копят счётчик неудачных ранов (см. skip_articles).
+        Таймауты идут в задержку хоста замером, равным таймауту.
+        """
+        now = time.time() if now is None else now
+        h = self.get(report.source)
+        failed = report.fetch_failed or (report.fetched == 0 and bool(report.errors))
+        for url in report.failed_articles:
+            n = h.article_failures.pop(url, 0) + 1
+            h.article_failures[url] = n  # в конец: самые свежие переживут обрезку
+            if n == ARTICLE_MAX_FAILED_RUNS:
+                logger.warning("Статья не скачивается %d ранов, больше не пробуем: %s", n, url)
+        while len(h.article_failures) > ARTICLE_MEMORY:
+            del h.article_failures[next(iter(h.article_failures))]
+
+        samples = report.http_requests + report.http_timeouts
+        if samples:
+            total = report.http_seconds + report.http_timeouts * report.timeout
+            self.observe_latency(report.source, total / samples)
+
+        if failed:
+            h.total_failures += 1
+            h.consecutive_failures += 1
+            h.last_error = report.errors[-1][:300]
+            h.score += SCORE_ALPHA * (0.0 - h.score)
+            if h.state == HALF_OPEN or h.consecutive_failures >= FAILURE_THRESHOLD:
+                h.state = OPEN
+                h.opened_at = int(now)
+                h.trips += 1
+                logger.warning("Breaker OPEN (%d-й раз, пауза %d c): %s",
+                               h.trips, self.cooldown(h), report.source)
+        else:
+            partial = 0.5 if report.errors else 1.0
+            h.score += SCORE_ALPHA * (partial - h.score)
+            h.consecutive_failures = 0
+            if h.state != CLOSED:
+                logger.info("Breaker закрыт, источник восстановился: %s", report.source)
+            h.state = CLOSED
+            h.trips = 0
+
+        report.breaker = h.state
+        return h
+
+    def snapshot(self, sources: List[str]) -> Dict[str, Any]:
+        result = {}
+        for src in sources:
+            h = self.get(src)
+            result[src] = {
+                "state": h.state,
+                "score": round(h.score, 3),
+                "consecutive_failures": h.consecutive_failures,
+                "timeout": self.timeout_for(src),
+            }
+        return result